@@ -1,14 +1,95 @@
 const express = require('express');
 const fs = require('fs').promises;
 const path = require('path');
+const os = require('os');
+const crypto = require('crypto');
 const cors = require('cors');
 
 const app = express();
 const PORT = process.env.PORT || 3000;
+const METADATA_FILENAME = 'metadata.json';
+const VALIDATE_LIMIT = 64;
+const PROBE_DEPTH = 2;
+const VALIDATE_CACHE_SIZE = 128;
+const EXECUTE_CONCURRENCY = parseInt(process.env.EXECUTE_CONCURRENCY) ||
+  Math.min(32, os.cpus().length * 4);
+const SCAN_CONCURRENCY = parseInt(process.env.SCAN_CONCURRENCY) || EXECUTE_CONCURRENCY;
+const JOB_TTL_MS = 30 * 60 * 1000;
+const PREVIEW_LIMIT = 100;
+const PAGE_LIMIT_MAX = 500;
+
+// Positive validation results keyed by real path + directory mtime. A Map
+// keeps insertion order, so re-inserting on hit makes the first key the LRU.
+// The root's mtime doesn't change when books are added deeper down, so only
+// "this is a library" answers stay valid; negatives and exact counts are
+// always recomputed.
+const validateCache = new Map();
+
+// Scans keep their plan server-side under a job id; /api/execute runs it
+// in the background and /api/status reports progress. Each job object
+// owns its own fields, and the event loop is single-threaded, so status
+// polls never wait on another job's progress.
+const jobs = new Map();
+
+// Job ids only need to be unique and hard to guess within this process:
+// a random per-process prefix plus a counter, instead of a fresh UUID
+// (and 16 bytes of CSPRNG output) per scan
+const JOB_ID_PREFIX = crypto.randomBytes(8).toString('hex');
+let jobSeq = 0;
+
+// Every field is assigned in the constructor so all jobs share one shape,
+// and status polls read the same fixed layout
+class Job {
+  constructor(libraryPath, plannedMoves) {
+    this.id = `${JOB_ID_PREFIX}${(jobSeq++).toString(16).padStart(8, '0')}`;
+    this.libraryPath = libraryPath;
+    this.plannedMoves = plannedMoves;
+    this.plannedCount = plannedMoves.length;
+    this.status = 'ready';
+    this.progress = { done: 0, total: plannedMoves.length };
+    this.results = null;
+    this.error = null;
+    this.updatedAt = Date.now();
+  }
+}
+
+function createJob(libraryPath, plannedMoves) {
+  const job = new Job(libraryPath, plannedMoves);
+  jobs.set(job.id, job);
+  return job;
+}
+
+// Evict jobs nobody has touched for a while so the map can't grow unbounded
+setInterval(() => {
+  const cutoff = Date.now() - JOB_TTL_MS;
+  for (const [id, job] of jobs) {
+    if (job.status !== 'running' && job.updatedAt < cutoff) {
+      jobs.delete(id);
+    }
+  }
+}, 60 * 1000).unref();
+
+// API responses are never revalidated, so don't SHA-1 every JSON body
+// (the whole scan plan included) just to build an ETag. express.static
+// sets its own ETags and is unaffected.
+app.set('etag', false);
 
 app.use(cors());
 app.use(express.json());
-app.use(express.static('public'));
+// Nothing under public/ is fingerprinted, so nothing can be cached as
+// immutable. Pages always revalidate (a 304 via ETag/Last-Modified when
+// unchanged); other assets may be reused for an hour first.
+app.use(express.static('public', {
+  etag: true,
+  lastModified: true,
+  setHeaders(res, filePath) {
+    if (path.extname(filePath) === '.html') {
+      res.setHeader('Cache-Control', 'no-cache');
+    } else {
+      res.setHeader('Cache-Control', 'public, max-age=3600, must-revalidate');
+    }
+  }
+}));
 
 // Utility functions
 function naturalSortKey(s) {
@@ -57,26 +138,61 @@ function getMetadataValue(data, keyNames) {
   return "";
 }
 
-async function findMetadataFiles(dir, results = []) {
-  try {
-    const entries = await fs.readdir(dir, { withFileTypes: true });
-    
-    for (const entry of entries) {
-      const fullPath = path.join(dir, entry.name);
-      
-      if (entry.isDirectory()) {
-        await findMetadataFiles(fullPath, results);
-      } else if (entry.name === 'metadata.json') {
-        results.push(fullPath);
+// Walks the tree with an explicit stack of directory handles so deep
+// libraries don't grow the call stack. Dirent type info means no extra
+// stat() per entry, and symlinked directories are not followed. Stops
+// once `limit` metadata files have been found.
+async function findMetadataFiles(root, limit = Infinity) {
+  const results = [];
+  const stack = [root];
+
+  while (stack.length > 0 && results.length < limit) {
+    const dir = stack.pop();
+    try {
+      // for-await closes the handle even when we break out early
+      for await (const entry of await fs.opendir(dir)) {
+        if (entry.isDirectory()) {
+          stack.push(path.join(dir, entry.name));
+        } else if (entry.name === METADATA_FILENAME) {
+          results.push(path.join(dir, entry.name));
+          if (results.length >= limit) break;
+        }
       }
+    } catch (err) {
+      console.error(`Error reading directory ${dir}:`, err.message);
     }
-  } catch (err) {
-    console.error(`Error reading directory ${dir}:`, err.message);
   }
-  
+
   return results;
 }
 
+// Breadth-first look at the top levels of the tree (root, authors,
+// books), where Audiobookshelf keeps metadata.json files. Returns true at
+// the first one found, without touching anything deeper.
+async function probeMetadataFiles(root, maxDepth = PROBE_DEPTH) {
+  let level = [root];
+
+  for (let depth = 0; depth <= maxDepth && level.length > 0; depth++) {
+    const next = [];
+    for (const dir of level) {
+      try {
+        for await (const entry of await fs.opendir(dir)) {
+          if (entry.isDirectory()) {
+            next.push(path.join(dir, entry.name));
+          } else if (entry.name === METADATA_FILENAME) {
+            return true;
+          }
+        }
+      } catch {
+        // Unreadable directories are reported by the full walk, if it runs
+      }
+    }
+    level = next;
+  }
+
+  return false;
+}
+
 async function getFileSize(filePath) {
   try {
     const stats = await fs.stat(filePath);
@@ -86,181 +202,440 @@ async function getFileSize(filePath) {
   }
 }
 
-// API Routes
-app.post('/api/scan', async (req, res) => {
-  const { libraryPath, formatConfig } = req.body;
-  
-  if (!libraryPath) {
-    return res.status(400).json({ error: 'Library path is required' });
-  }
+// Log lines from concurrent workers are queued and written by a single
+// flush per event-loop turn. stderr is a synchronous pipe write under
+// Docker, so this keeps workers from blocking on each message.
+const logQueue = [];
 
-  try {
-    // Verify path exists
-    await fs.access(libraryPath);
-    
-    console.log(`Scanning library at: ${libraryPath}`);
-    const metadataFiles = await findMetadataFiles(libraryPath);
-    console.log(`Found ${metadataFiles.length} metadata files`);
-
-    const stats = {
-      books: 0,
-      authors: new Set(),
-      narrators: new Set(),
-      series: new Set(),
-      totalSize: 0,
-      totalDuration: 0,
-      standaloneCount: 0
-    };
+function flushLogQueue() {
+  process.stderr.write(logQueue.join(''));
+  logQueue.length = 0;
+}
 
-    const plannedMoves = [];
-    const audioExtensions = new Set(['.mp3', '.m4b', '.m4a', '.flac', '.ogg', '.opus', '.aac']);
+function queueLog(message) {
+  if (logQueue.length === 0) setImmediate(flushLogQueue);
+  logQueue.push(message + '\n');
+}
 
-    for (const metaPath of metadataFiles) {
+// Runs worker over items with at most `limit` calls in flight
+async function runWithConcurrency(items, limit, worker) {
+  let next = 0;
+  const runners = Array.from({ length: Math.min(limit, items.length) }, async () => {
+    while (next < items.length) {
+      await worker(items[next++]);
+    }
+  });
+  await Promise.all(runners);
+}
+
+async function executeBookMove(book, ctx) {
+  const { results, claimed, targetDirs } = ctx;
+  try {
+    // Create target directory
+    await fs.mkdir(book.targetDir, { recursive: true });
+
+    // Move files
+    for (const fileMove of book.movePlan) {
       try {
-        const content = await fs.readFile(metaPath, 'utf-8');
-        const data = JSON.parse(content);
-
-        stats.books++;
-        
-        const author = getMetadataValue(data, ['authorName', 'author', 'authors', 'bookAuthor']) || "Unknown Author";
-        const bookTitle = getMetadataValue(data, ['title', 'bookTitle']) || "Unknown Title";
-        const narrator = getMetadataValue(data, ['narratorName', 'narrator', 'narrators']) || "Unknown Narrator";
-        const seriesField = getMetadataValue(data, ['seriesName', 'series']) || "";
-        const durationRaw = data.duration || (data.metadata && data.metadata.duration) || 0;
-
-        stats.authors.add(author);
-        if (narrator !== "Unknown Narrator") stats.narrators.add(narrator);
-
-        let seriesTitle = "";
-        let bookNumber = "";
-
-        if (seriesField) {
-          if (seriesField.includes("#")) {
-            const parts = seriesField.split("#");
-            seriesTitle = cleanFilename(parts[0]);
-            const rawNum = parts[1].trim();
-            if (rawNum.includes(".")) {
-              const nParts = rawNum.split(".");
-              bookNumber = `${nParts[0].padStart(2, '0')}.${nParts[1]}`;
-            } else if (!isNaN(rawNum)) {
-              bookNumber = rawNum.padStart(2, '0');
-            } else {
-              bookNumber = rawNum;
-            }
-            stats.series.add(seriesTitle);
-          } else {
-            seriesTitle = cleanFilename(seriesField);
-            stats.series.add(seriesTitle);
-          }
-        } else {
-          stats.standaloneCount++;
+        const oldPath = path.join(book.bookDir, fileMove.oldName);
+        const newPath = path.join(book.targetDir, fileMove.newName);
+
+        // Check if already exists
+        if (oldPath === newPath) {
+          continue;
         }
 
-        stats.totalDuration += parseFloat(durationRaw) || 0;
+        // Books move concurrently, so claim the target synchronously
+        // before awaiting; otherwise two books could both see it free
+        // and the second rename would overwrite the first. A claim
+        // settles to whether a file ended up at the target, so a book
+        // waiting on a failed move can still take the path, as it would
+        // in a serial loop.
+        let occupied = false;
+        while (claimed.has(newPath)) {
+          occupied = await claimed.get(newPath);
+          if (occupied) break;
+        }
+        if (occupied) {
+          results.collisions.add(fileMove.newName);
+          continue;
+        }
 
-        const cleanAuthor = cleanFilename(author);
-        const cleanTitle = cleanFilename(bookTitle);
+        let settle;
+        claimed.set(newPath, new Promise(resolve => { settle = resolve; }));
 
-        // Build target path
-        let targetPath;
-        if (formatConfig.folderFormat === 'author-series-book' && seriesTitle) {
-          const folderLabel = bookNumber ? `${bookNumber} ${cleanTitle}` : cleanTitle;
-          targetPath = path.join(libraryPath, cleanAuthor, seriesTitle, folderLabel);
-        } else {
-          targetPath = path.join(libraryPath, cleanAuthor, cleanTitle);
+        try {
+          await fs.access(newPath);
+          settle(true);
+          results.collisions.add(fileMove.newName);
+          continue;
+        } catch {
+          // File doesn't exist, good to move
         }
 
-        const bookDir = path.dirname(metaPath);
-        const allFiles = await fs.readdir(bookDir);
-        
-        // Get file sizes
-        for (const file of allFiles) {
-          const filePath = path.join(bookDir, file);
-          stats.totalSize += await getFileSize(filePath);
+        try {
+          await fs.rename(oldPath, newPath);
+          settle(true);
+        } catch (err) {
+          claimed.delete(newPath);
+          settle(false);
+          throw err;
         }
+      } catch (err) {
+        queueLog(`Error moving file ${fileMove.oldName}: ${err.message}`);
+        results.errors++;
+      }
+    }
 
-        // Filter audio files
-        const audioFiles = allFiles
-          .filter(f => audioExtensions.has(path.extname(f).toLowerCase()))
-          .sort((a, b) => {
-            const aKey = naturalSortKey(a);
-            const bKey = naturalSortKey(b);
-            return aKey < bKey ? -1 : aKey > bKey ? 1 : 0;
-          });
+    // Try to remove old directory if empty, unless another book in this
+    // batch is moving into it concurrently
+    if (!targetDirs.has(book.bookDir)) {
+      try {
+        const remaining = await fs.readdir(book.bookDir);
+        if (remaining.length === 0) {
+          await fs.rmdir(book.bookDir);
+        }
+      } catch {
+        // Ignore errors when removing directory
+      }
+    }
+
+    results.applied++;
+  } catch (err) {
+    queueLog(`Error processing book ${book.title}: ${err.message}`);
+    results.errors++;
+  }
+}
+
+// Picks the books at selectedIndices (positions in the scan response).
+// A byte mask drops out-of-range and duplicate indices in one pass and
+// keeps plan order, so no book is moved twice.
+function selectBooks(plannedMoves, selectedIndices) {
+  const mask = new Uint8Array(plannedMoves.length);
+  for (const i of selectedIndices) {
+    if (Number.isInteger(i) && i >= 0 && i < mask.length) mask[i] = 1;
+  }
+  return plannedMoves.filter((_, i) => mask[i]);
+}
+
+async function processJob(job, books) {
+  const results = {
+    applied: 0,
+    errors: 0,
+    collisions: new Set()
+  };
+
+  try {
+    // Each book's moves are independent, so overlap their filesystem
+    // round trips instead of awaiting one book at a time
+    const ctx = {
+      results,
+      claimed: new Map(),
+      targetDirs: new Set(books.map(b => b.targetDir))
+    };
+    await runWithConcurrency(books, EXECUTE_CONCURRENCY, async book => {
+      await executeBookMove(book, ctx);
+      job.progress.done++;
+    });
+
+    // The same name (e.g. metadata.json) can collide in many books;
+    // report each once
+    job.results = { ...results, collisions: [...results.collisions].sort() };
+    job.status = 'complete';
+  } catch (err) {
+    console.error('Execute error:', err);
+    job.error = err.message;
+    job.status = 'error';
+  }
+  // A plan can only be applied once; drop it rather than holding every
+  // book's file list until the job is evicted
+  job.plannedMoves = null;
+  job.updatedAt = Date.now();
+}
+
+// Scans resolve the library root once, so every book and target path is
+// built from the same absolute, normalized string. rootPrefix (the root
+// plus a trailing separator) is computed once per scan and paths under it
+// are sliced, rather than path.relative() resolving both arguments for
+// every book.
+function libraryRootPrefix(root) {
+  return root.endsWith(path.sep) ? root : root + path.sep;
+}
+
+function relativeToRoot(p, rootPrefix) {
+  if (p.startsWith(rootPrefix)) return p.slice(rootPrefix.length);
+  return p + path.sep === rootPrefix ? '' : p;
+}
+
+function serializeBookMove(book, rootPrefix) {
+  return {
+    title: book.title,
+    author: book.author,
+    oldPath: relativeToRoot(book.bookDir, rootPrefix),
+    newPath: relativeToRoot(book.targetDir, rootPrefix)
+  };
+}
 
-        const movePlan = [];
-        const numAudio = audioFiles.length;
-
-        // Build file names
-        audioFiles.forEach((audioFile, i) => {
-          let newName;
-          if (formatConfig.fileFormat === 'full-details') {
-            const nameParts = [cleanAuthor];
-            if (seriesTitle) {
-              nameParts.push(`${seriesTitle} ${bookNumber}`.trim());
-            }
-            nameParts.push(cleanTitle);
-            const baseName = nameParts.filter(p => p).join(" - ");
-            const ext = path.extname(audioFile);
-            newName = `${baseName}${numAudio > 1 ? ' - ' + String(i + 1).padStart(2, '0') : ''}${ext}`;
-          } else if (formatConfig.fileFormat === 'title-only') {
-            const ext = path.extname(audioFile);
-            newName = `${cleanTitle}${numAudio > 1 ? ' - ' + String(i + 1).padStart(2, '0') : ''}${ext}`;
+// Builds the move plan for every book under libraryPath. onBook is called
+// with each planned book as soon as it is known, in plannedMoves order
+// (which is completion order, not directory order).
+async function scanLibrary(libraryPath, formatConfig, onBook = () => {}) {
+  console.log(`Scanning library at: ${libraryPath}`);
+  const metadataFiles = await findMetadataFiles(libraryPath);
+  console.log(`Found ${metadataFiles.length} metadata files`);
+
+  const stats = {
+    books: 0,
+    authors: new Set(),
+    narrators: new Set(),
+    series: new Set(),
+    totalSize: 0,
+    totalDuration: 0,
+    standaloneCount: 0
+  };
+
+  const plannedMoves = [];
+  const audioExtensions = new Set(['.mp3', '.m4b', '.m4a', '.flac', '.ogg', '.opus', '.aac']);
+
+  const planBook = async metaPath => {
+    try {
+      const content = await fs.readFile(metaPath, 'utf-8');
+      const data = JSON.parse(content);
+
+      stats.books++;
+      
+      const author = getMetadataValue(data, ['authorName', 'author', 'authors', 'bookAuthor']) || "Unknown Author";
+      const bookTitle = getMetadataValue(data, ['title', 'bookTitle']) || "Unknown Title";
+      const narrator = getMetadataValue(data, ['narratorName', 'narrator', 'narrators']) || "Unknown Narrator";
+      const seriesField = getMetadataValue(data, ['seriesName', 'series']) || "";
+      const durationRaw = data.duration || (data.metadata && data.metadata.duration) || 0;
+
+      stats.authors.add(author);
+      if (narrator !== "Unknown Narrator") stats.narrators.add(narrator);
+
+      let seriesTitle = "";
+      let bookNumber = "";
+
+      if (seriesField) {
+        if (seriesField.includes("#")) {
+          const parts = seriesField.split("#");
+          seriesTitle = cleanFilename(parts[0]);
+          const rawNum = parts[1].trim();
+          if (rawNum.includes(".")) {
+            const nParts = rawNum.split(".");
+            bookNumber = `${nParts[0].padStart(2, '0')}.${nParts[1]}`;
+          } else if (!isNaN(rawNum)) {
+            bookNumber = rawNum.padStart(2, '0');
           } else {
-            newName = audioFile;
+            bookNumber = rawNum;
           }
+          stats.series.add(seriesTitle);
+        } else {
+          seriesTitle = cleanFilename(seriesField);
+          stats.series.add(seriesTitle);
+        }
+      } else {
+        stats.standaloneCount++;
+      }
 
-          movePlan.push({
-            oldName: audioFile,
-            newName: cleanFilename(newName),
-            oldPath: path.join(bookDir, audioFile),
-            type: 'audio'
-          });
+      stats.totalDuration += parseFloat(durationRaw) || 0;
+
+      const cleanAuthor = cleanFilename(author);
+      const cleanTitle = cleanFilename(bookTitle);
+
+      // Build target path
+      let targetPath;
+      if (formatConfig.folderFormat === 'author-series-book' && seriesTitle) {
+        const folderLabel = bookNumber ? `${bookNumber} ${cleanTitle}` : cleanTitle;
+        targetPath = path.join(libraryPath, cleanAuthor, seriesTitle, folderLabel);
+      } else {
+        targetPath = path.join(libraryPath, cleanAuthor, cleanTitle);
+      }
+
+      const bookDir = path.dirname(metaPath);
+      const entries = await fs.readdir(bookDir, { withFileTypes: true });
+      const allFiles = entries.map(e => e.name);
+
+      // Get file sizes; Dirent already tells us which entries are files.
+      // Symlinks are stat()ed too so linked audio counts at its target's
+      // size (dangling links count as 0). Stat them as one batch and sum
+      // once instead of awaiting each.
+      const sizes = await Promise.all(entries
+        .filter(e => e.isFile() || e.isSymbolicLink())
+        .map(e => getFileSize(path.join(bookDir, e.name))));
+      stats.totalSize += sizes.reduce((sum, size) => sum + size, 0);
+
+      // Filter audio files
+      const audioFiles = allFiles
+        .filter(f => audioExtensions.has(path.extname(f).toLowerCase()))
+        .sort((a, b) => {
+          const aKey = naturalSortKey(a);
+          const bKey = naturalSortKey(b);
+          return aKey < bKey ? -1 : aKey > bKey ? 1 : 0;
         });
 
-        // Add other files
-        allFiles.forEach(f => {
-          if (!audioFiles.includes(f)) {
-            movePlan.push({
-              oldName: f,
-              newName: f,
-              oldPath: path.join(bookDir, f),
-              type: 'other'
-            });
+      const movePlan = [];
+      const numAudio = audioFiles.length;
+
+      // Build file names
+      audioFiles.forEach((audioFile, i) => {
+        let newName;
+        if (formatConfig.fileFormat === 'full-details') {
+          const nameParts = [cleanAuthor];
+          if (seriesTitle) {
+            nameParts.push(`${seriesTitle} ${bookNumber}`.trim());
           }
+          nameParts.push(cleanTitle);
+          const baseName = nameParts.filter(p => p).join(" - ");
+          const ext = path.extname(audioFile);
+          newName = `${baseName}${numAudio > 1 ? ' - ' + String(i + 1).padStart(2, '0') : ''}${ext}`;
+        } else if (formatConfig.fileFormat === 'title-only') {
+          const ext = path.extname(audioFile);
+          newName = `${cleanTitle}${numAudio > 1 ? ' - ' + String(i + 1).padStart(2, '0') : ''}${ext}`;
+        } else {
+          newName = audioFile;
+        }
+
+        movePlan.push({
+          oldName: audioFile,
+          newName: cleanFilename(newName),
+          type: 'audio'
         });
+      });
 
-        // Check if changes needed
-        const hasChanges = (bookDir !== targetPath) || 
-                          movePlan.some(m => m.oldName !== m.newName);
-
-        if (hasChanges) {
-          plannedMoves.push({
-            title: bookTitle,
-            author: author,
-            oldPath: path.relative(libraryPath, bookDir),
-            newPath: path.relative(libraryPath, targetPath),
-            movePlan: movePlan,
-            bookDir: bookDir,
-            targetDir: targetPath
+      // Add other files. Entries hold names only; full paths are rebuilt
+      // from bookDir at execute time rather than kept per file per job.
+      allFiles.forEach(f => {
+        if (!audioFiles.includes(f)) {
+          movePlan.push({
+            oldName: f,
+            newName: f,
+            type: 'other'
           });
         }
-      } catch (err) {
-        console.error(`Error processing ${metaPath}:`, err.message);
+      });
+
+      // Check if changes needed
+      const hasChanges = (bookDir !== targetPath) || 
+                        movePlan.some(m => m.oldName !== m.newName);
+
+      if (hasChanges) {
+        const book = {
+          title: bookTitle,
+          author: author,
+          movePlan: movePlan,
+          bookDir: bookDir,
+          targetDir: targetPath
+        };
+        plannedMoves.push(book);
+        onBook(book);
+      }
+    } catch (err) {
+      queueLog(`Error processing ${metaPath}: ${err.message}`);
+    }
+  };
+
+  // Books are planned independently, so keep several metadata reads and
+  // directory listings in flight rather than awaiting one book at a time
+  await runWithConcurrency(metadataFiles, SCAN_CONCURRENCY, planBook);
+
+  return {
+    stats: {
+      books: stats.books,
+      authors: stats.authors.size,
+      narrators: stats.narrators.size,
+      series: stats.series.size,
+      standalone: stats.standaloneCount,
+      totalDuration: stats.totalDuration,
+      totalSize: stats.totalSize
+    },
+    plannedMoves
+  };
+}
+
+// API Routes
+// Answers whether libraryPath looks like a library. metadataFiles is a lower
+// bound (1 after a successful shallow probe, at most VALIDATE_LIMIT from the
+// walk) unless the client asks for an exact count.
+app.post('/api/validate', async (req, res) => {
+  const { libraryPath } = req.body;
+  const exact = req.body.exact === true;
+
+  if (!libraryPath) {
+    return res.status(400).json({ error: 'Library path is required' });
+  }
+
+  let cacheKey;
+  try {
+    const realPath = await fs.realpath(libraryPath);
+    const stats = await fs.stat(realPath, { bigint: true });
+    if (!stats.isDirectory()) {
+      return res.status(400).json({ error: `Not a directory: ${libraryPath}` });
+    }
+    cacheKey = `${realPath}\0${stats.mtimeNs}`;
+  } catch {
+    return res.status(404).json({ error: `Path not found: ${libraryPath}` });
+  }
+
+  const cached = exact ? undefined : validateCache.get(cacheKey);
+  if (cached) {
+    validateCache.delete(cacheKey);
+    validateCache.set(cacheKey, cached);
+    return res.json(cached);
+  }
+
+  try {
+    let metadataFiles;
+    if (exact) {
+      metadataFiles = (await findMetadataFiles(libraryPath)).length;
+    } else if (await probeMetadataFiles(libraryPath)) {
+      metadataFiles = 1;
+    } else {
+      // Nothing near the top; walk deeper, but stop early
+      metadataFiles = (await findMetadataFiles(libraryPath, VALIDATE_LIMIT)).length;
+    }
+    const result = { metadataFiles, isLibrary: metadataFiles > 0 };
+
+    if (result.isLibrary && !exact) {
+      validateCache.set(cacheKey, result);
+      if (validateCache.size > VALIDATE_CACHE_SIZE) {
+        validateCache.delete(validateCache.keys().next().value);
       }
     }
 
+    res.json(result);
+  } catch (err) {
+    console.error('Validate error:', err);
+    res.status(500).json({ error: err.message });
+  }
+});
+
+app.post('/api/scan', async (req, res) => {
+  const { libraryPath, formatConfig } = req.body;
+  
+  if (!libraryPath) {
+    return res.status(400).json({ error: 'Library path is required' });
+  }
+
+  const root = path.resolve(libraryPath);
+
+  try {
+    // Verify path exists and is a directory with a single stat()
+    const rootStats = await fs.stat(root);
+    if (!rootStats.isDirectory()) {
+      return res.status(400).json({ error: `Not a directory: ${libraryPath}` });
+    }
+
+    const { stats, plannedMoves } = await scanLibrary(root, formatConfig);
+    const job = createJob(root, plannedMoves);
+    const rootPrefix = libraryRootPrefix(root);
+
+    // Only a preview goes out with the scan; the rest is paged on demand
     res.json({
-      stats: {
-        books: stats.books,
-        authors: stats.authors.size,
-        narrators: stats.narrators.size,
-        series: stats.series.size,
-        standalone: stats.standaloneCount,
-        totalDuration: stats.totalDuration,
-        totalSize: stats.totalSize
-      },
-      plannedMoves: plannedMoves
+      jobId: job.id,
+      stats,
+      plannedCount: plannedMoves.length,
+      plannedMoves: plannedMoves.slice(0, PREVIEW_LIMIT).map(b => serializeBookMove(b, rootPrefix))
     });
 
   } catch (err) {
@@ -269,72 +644,124 @@ app.post('/api/scan', async (req, res) => {
   }
 });
 
-app.post('/api/execute', async (req, res) => {
-  const { plannedMoves } = req.body;
-  
-  if (!plannedMoves || !Array.isArray(plannedMoves)) {
-    return res.status(400).json({ error: 'Planned moves required' });
+// Same as /api/scan, but sends NDJSON: a {type: 'book'} line for each of the
+// first PREVIEW_LIMIT planned books as they are found, a {type: 'count'}
+// line every PREVIEW_LIMIT books after that, then a final {type: 'done'}
+// line with the job id, stats and total count, so the UI can render while
+// the library is still being walked.
+app.post('/api/scan/stream', async (req, res) => {
+  const { libraryPath, formatConfig } = req.body;
+
+  if (!libraryPath) {
+    return res.status(400).json({ error: 'Library path is required' });
   }
 
-  const results = {
-    applied: 0,
-    errors: 0,
-    collisions: []
-  };
+  const root = path.resolve(libraryPath);
 
   try {
-    for (const book of plannedMoves) {
-      try {
-        // Create target directory
-        await fs.mkdir(book.targetDir, { recursive: true });
-
-        // Move files
-        for (const fileMove of book.movePlan) {
-          try {
-            const newPath = path.join(book.targetDir, fileMove.newName);
-            
-            // Check if already exists
-            if (fileMove.oldPath === newPath) {
-              continue;
-            }
-
-            try {
-              await fs.access(newPath);
-              results.collisions.push(fileMove.newName);
-              continue;
-            } catch {
-              // File doesn't exist, good to move
-            }
-
-            await fs.rename(fileMove.oldPath, newPath);
-          } catch (err) {
-            console.error(`Error moving file ${fileMove.oldName}:`, err.message);
-            results.errors++;
-          }
-        }
+    const rootStats = await fs.stat(root);
+    if (!rootStats.isDirectory()) {
+      return res.status(400).json({ error: `Not a directory: ${libraryPath}` });
+    }
+  } catch (err) {
+    console.error('Scan error:', err);
+    return res.status(500).json({ error: err.message });
+  }
 
-        // Try to remove old directory if empty
-        try {
-          const remaining = await fs.readdir(book.bookDir);
-          if (remaining.length === 0) {
-            await fs.rmdir(book.bookDir);
-          }
-        } catch {
-          // Ignore errors when removing directory
-        }
+  res.type('application/x-ndjson');
+  const rootPrefix = libraryRootPrefix(root);
+  const writeLine = obj => res.write(JSON.stringify(obj) + '\n');
 
-        results.applied++;
-      } catch (err) {
-        console.error(`Error processing book ${book.title}:`, err.message);
-        results.errors++;
+  try {
+    let planned = 0;
+    const { stats, plannedMoves } = await scanLibrary(root, formatConfig, book => {
+      planned++;
+      if (planned <= PREVIEW_LIMIT) {
+        writeLine({ type: 'book', book: serializeBookMove(book, rootPrefix) });
+      } else if (planned % PREVIEW_LIMIT === 0) {
+        writeLine({ type: 'count', planned });
       }
-    }
+    });
+    const job = createJob(root, plannedMoves);
 
-    res.json(results);
+    writeLine({ type: 'done', jobId: job.id, stats, plannedCount: plannedMoves.length });
   } catch (err) {
-    console.error('Execute error:', err);
-    res.status(500).json({ error: err.message });
+    console.error('Scan error:', err);
+    writeLine({ type: 'error', error: err.message });
+  }
+  res.end();
+});
+
+app.get('/api/jobs/:jobId/moves', (req, res) => {
+  const job = jobs.get(req.params.jobId);
+
+  if (!job) {
+    return res.status(404).json({ error: 'Job not found' });
+  }
+  if (!job.plannedMoves) {
+    return res.status(410).json({ error: 'Changes already applied' });
+  }
+
+  const offset = Math.max(0, parseInt(req.query.offset) || 0);
+  const limit = Math.min(PAGE_LIMIT_MAX, Math.max(1, parseInt(req.query.limit) || PREVIEW_LIMIT));
+  const rootPrefix = libraryRootPrefix(job.libraryPath);
+
+  job.updatedAt = Date.now();
+  res.json({
+    offset,
+    total: job.plannedCount,
+    plannedMoves: job.plannedMoves.slice(offset, offset + limit).map(b => serializeBookMove(b, rootPrefix))
+  });
+});
+
+app.post('/api/execute', (req, res) => {
+  const { jobId, selectedIndices } = req.body;
+  const job = jobs.get(jobId);
+
+  if (!job) {
+    return res.status(404).json({ error: 'Scan not found, please scan again' });
+  }
+  if (job.status !== 'ready') {
+    return res.status(409).json({ error: `Changes already ${job.status}` });
   }
+
+  if (selectedIndices !== undefined && !Array.isArray(selectedIndices)) {
+    return res.status(400).json({ error: 'selectedIndices must be an array' });
+  }
+
+  // Apply every planned book unless the client picked a subset. Either
+  // way the job runs once: applying a subset ends it and drops the plan,
+  // so the remaining books need a new scan.
+  const books = selectedIndices
+    ? selectBooks(job.plannedMoves, selectedIndices)
+    : job.plannedMoves;
+
+  if (selectedIndices && books.length === 0) {
+    return res.status(400).json({ error: 'selectedIndices matched no planned books' });
+  }
+
+  job.status = 'running';
+  job.progress = { done: 0, total: books.length };
+  job.updatedAt = Date.now();
+  processJob(job, books);
+
+  res.status(202).json({ jobId: job.id, status: job.status });
+});
+
+app.get('/api/status/:jobId', (req, res) => {
+  const job = jobs.get(req.params.jobId);
+
+  if (!job) {
+    return res.status(404).json({ error: 'Job not found' });
+  }
+
+  job.updatedAt = Date.now();
+  res.json({
+    status: job.status,
+    progress: job.progress,
+    results: job.results,
+    error: job.error
+  });
 });
 
 app.listen(PORT, '0.0.0.0', () => {